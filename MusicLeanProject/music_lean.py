@@ -7,26 +7,49 @@ Measures Before/After efficiency -> Generates visual proof of improvement.
 
 import os
 import csv
+import importlib.util
 import time
 import subprocess
+import shutil
 import sys
 import webbrowser
 from datetime import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
+
+# numpy / pandas / matplotlib are imported lazily in generate_visualizations()
+# so the simulate + Picard steps don't pay their import cost.
+
+# Headless runs (piped output or MUSIC_LEAN_HEADLESS=1) render with Agg and never open a window
+_HEADLESS = not sys.stdout.isatty() or os.environ.get("MUSIC_LEAN_HEADLESS") == "1"
+# Dramatic pauses in the simulations are opt-in (MUSIC_LEAN_DEMO=1)
+_DEMO = os.environ.get("MUSIC_LEAN_DEMO") == "1"
+# The Parquet log is optional; without pyarrow everything stays in the CSV log
+_HAVE_PYARROW = importlib.util.find_spec("pyarrow") is not None
 
 # ===========================
 # CONFIGURATION
 # ===========================
 MUSIC_INPUT_DIR = "sample_music"        # Folder with unstructured MP3s
 MUSIC_OUTPUT_DIR = "organized_output"   # Where Picard will save organized files
-LOG_FILE = "data/process_log.csv"
+MUSIC_INPUT_ABS = os.path.abspath(MUSIC_INPUT_DIR)
+LOG_FILE = "data/process_log.parquet"      # Columnar log (needs pyarrow)
+PENDING_LOG_FILE = "data/process_log.csv"  # Append-only; folded into LOG_FILE when charting
 CHART_FILE = "data/lean_results.png"
+MUSIC_EXTENSIONS = frozenset({".mp3", ".flac", ".m4a", ".wav"})
+# Log schema, in column order
+LOG_DTYPES = {
+    "session_type": "category",
+    "songs_processed": "int32",
+    "total_time_min": "float32",
+    "avg_time_per_song_sec": "int32",
+    "manual_actions_per_song": "float32",
+    "errors": "int32",
+    "duplicates": "int32",
+}
 
 # Create folders if missing
-os.makedirs(MUSIC_INPUT_DIR, exist_ok=True)
-os.makedirs(MUSIC_OUTPUT_DIR, exist_ok=True)
-os.makedirs("data", exist_ok=True)
+for _dir in (MUSIC_INPUT_DIR, MUSIC_OUTPUT_DIR, "data"):
+    if not os.path.isdir(_dir):
+        os.makedirs(_dir, exist_ok=True)
 
 # ===========================
 # SIMULATE "BEFORE" MANUAL PROCESS
@@ -40,7 +63,8 @@ def simulate_before_state(file_count):
     - Slow per-song time
     """
     print("\nSimulating BEFORE state (Manual Process)...")
-    time.sleep(2)
+    if _DEMO:
+        time.sleep(2)
 
     # Simulate metrics based on real-world manual effort
     avg_time_per_song = 189  # seconds (3.15 min)
@@ -49,11 +73,14 @@ def simulate_before_state(file_count):
     errors = max(1, int(file_count * 0.15))  # 15% error rate
     duplicates = max(0, int(file_count * 0.1))  # 10% duplicates
 
-    print(f"Files to process: {file_count}")
-    print(f"Simulated total time: {total_time_sec//60} min {total_time_sec%60} sec")
-    print(f"Manual actions per song: {manual_actions}")
-    print(f"Errors: {errors}")
-    print(f"Duplicates: {duplicates}")
+    total_min, total_sec = divmod(total_time_sec, 60)
+    sys.stdout.write(
+        f"Files to process: {file_count}\n"
+        f"Simulated total time: {total_min} min {total_sec} sec\n"
+        f"Manual actions per song: {manual_actions}\n"
+        f"Errors: {errors}\n"
+        f"Duplicates: {duplicates}\n"
+    )
 
     return {
         "session_type": "before",
@@ -68,34 +95,47 @@ def simulate_before_state(file_count):
 # ===========================
 # LAUNCH MUSICBRAINZ PICARD
 # ===========================
+# Common Picard install paths, checked when 'picard' is not on PATH
+PICARD_PATHS = (
+    r"C:\Program Files\MusicBrainz Picard\picard.exe",  # Windows
+    r"C:\Program Files (x86)\MusicBrainz Picard\picard.exe",
+    "/Applications/MusicBrainz Picard.app/Contents/MacOS/picard",  # macOS
+    "/usr/bin/picard",  # Linux
+    "picard"  # If in PATH
+)
+_PICARD_CMD = None
+
+def _resolve_picard():
+    """Return the Picard command, resolving it only on the first call"""
+    global _PICARD_CMD
+    if _PICARD_CMD:
+        return _PICARD_CMD
+
+    _PICARD_CMD = shutil.which("picard")
+    if not _PICARD_CMD:
+        for path in PICARD_PATHS:
+            if path == "picard" or os.path.exists(path):
+                _PICARD_CMD = path
+                break
+    return _PICARD_CMD
+
 def launch_picard():
     """
     Opens MusicBrainz Picard with the input folder.
     Waits for user to finish tagging -> then press ENTER.
     """
-    print("\n" + "="*60)
-    print("LAUNCHING LEAN SOLUTION: MusicBrainz Picard")
-    print("="*60)
-    print("1. Picard will open with your music folder loaded.")
-    print("2. Click 'Cluster' -> 'Lookup' -> Review matches -> 'Save'")
-    print("3. Picard will auto-rename & move files to 'organized_output/'")
-    print("4. AFTER you finish, COME BACK HERE and press ENTER.")
-    print("="*60)
-
-    # Try common Picard install paths
-    picard_paths = [
-        r"C:\Program Files\MusicBrainz Picard\picard.exe",  # Windows
-        r"C:\Program Files (x86)\MusicBrainz Picard\picard.exe",
-        "/Applications/MusicBrainz Picard.app/Contents/MacOS/picard",  # macOS
-        "/usr/bin/picard",  # Linux
-        "picard"  # If in PATH
-    ]
-
-    picard_cmd = None
-    for path in picard_paths:
-        if os.path.exists(path) or path == "picard":
-            picard_cmd = path
-            break
+    sys.stdout.write(
+        "\n" + "="*60 + "\n"
+        "LAUNCHING LEAN SOLUTION: MusicBrainz Picard\n"
+        + "="*60 + "\n"
+        "1. Picard will open with your music folder loaded.\n"
+        "2. Click 'Cluster' -> 'Lookup' -> Review matches -> 'Save'\n"
+        "3. Picard will auto-rename & move files to 'organized_output/'\n"
+        "4. AFTER you finish, COME BACK HERE and press ENTER.\n"
+        + "="*60 + "\n"
+    )
+
+    picard_cmd = _resolve_picard()
 
     if not picard_cmd:
         print("MusicBrainz Picard not found.")
@@ -107,15 +147,17 @@ def launch_picard():
     try:
         # Launch Picard with input folder
         if sys.platform == "darwin":  # macOS
-            subprocess.Popen(["open", "-a", picard_cmd, os.path.abspath(MUSIC_INPUT_DIR)])
+            subprocess.Popen(["open", "-a", picard_cmd, MUSIC_INPUT_ABS])
         else:
-            subprocess.Popen([picard_cmd, os.path.abspath(MUSIC_INPUT_DIR)])
+            subprocess.Popen([picard_cmd, MUSIC_INPUT_ABS])
     except Exception as e:
         print(f"Failed to launch Picard: {e}")
         sys.exit(1)
 
-    print(f"\nOpening folder: {os.path.abspath(MUSIC_INPUT_DIR)}")
-    print("Waiting for you to finish organizing in Picard...")
+    sys.stdout.write(
+        f"\nOpening folder: {MUSIC_INPUT_ABS}\n"
+        "Waiting for you to finish organizing in Picard...\n"
+    )
     input("\nWhen DONE in Picard, press ENTER to continue...")
 
 # ===========================
@@ -129,7 +171,8 @@ def simulate_after_state(file_count):
     - Near-zero errors
     """
     print("\nSimulating AFTER state (Automated Process)...")
-    time.sleep(1)
+    if _DEMO:
+        time.sleep(1)
 
     avg_time_per_song = 38  # seconds
     total_time_sec = file_count * avg_time_per_song
@@ -137,11 +180,14 @@ def simulate_after_state(file_count):
     errors = 0 if file_count < 10 else max(0, int(file_count * 0.01))  # 1% error
     duplicates = 0
 
-    print(f"Files processed: {file_count}")
-    print(f"Simulated total time: {total_time_sec//60} min {total_time_sec%60} sec")
-    print(f"Manual actions per song: {manual_actions}")
-    print(f"Errors: {errors}")
-    print(f"Duplicates: {duplicates}")
+    total_min, total_sec = divmod(total_time_sec, 60)
+    sys.stdout.write(
+        f"Files processed: {file_count}\n"
+        f"Simulated total time: {total_min} min {total_sec} sec\n"
+        f"Manual actions per song: {manual_actions}\n"
+        f"Errors: {errors}\n"
+        f"Duplicates: {duplicates}\n"
+    )
 
     return {
         "session_type": "after",
@@ -154,76 +200,147 @@ def simulate_after_state(file_count):
     }
 
 # ===========================
-# LOG DATA TO CSV
+# LOG DATA
 # ===========================
 def log_data(data):
-    """Append session data to CSV log"""
-    file_exists = os.path.isfile(LOG_FILE)
+    """Append session data to the CSV log (written to disk immediately)"""
+    write_header = not os.path.exists(PENDING_LOG_FILE) or os.path.getsize(PENDING_LOG_FILE) == 0
 
-    with open(LOG_FILE, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=data.keys())
-        if not file_exists:
+    with open(PENDING_LOG_FILE, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(LOG_DTYPES))
+        if write_header:
             writer.writeheader()
         writer.writerow(data)
 
+def _read_pending_log():
+    """Load the CSV log with the log schema, skipping incomplete rows"""
+    import pandas as pd
+
+    df = pd.read_csv(PENDING_LOG_FILE, engine='c', usecols=list(LOG_DTYPES))
+    return df.dropna().astype(LOG_DTYPES)
+
+def _fold_pending_log():
+    """Move the CSV log rows into the Parquet log and return the combined log"""
+    import pandas as pd
+
+    df = _read_pending_log()
+    if os.path.exists(LOG_FILE):
+        df = pd.concat([pd.read_parquet(LOG_FILE), df], ignore_index=True).astype(LOG_DTYPES)
+
+    # Parquet can't be appended to in place -> rewrite, then swap in atomically
+    tmp_file = LOG_FILE + ".tmp"
+    df.to_parquet(tmp_file, engine='pyarrow', compression='snappy', index=False)
+    os.replace(tmp_file, LOG_FILE)
+    os.remove(PENDING_LOG_FILE)
+    return df
+
 # ===========================
 # GENERATE VISUALIZATIONS
 # ===========================
+# Chart invariants; _METRICS order matches _TITLES and the averaged columns
+_METRICS = ('avg_time_per_song_sec', 'manual_actions_per_song', 'errors', 'duplicates')
+_TITLES = (
+    'Avg Time per Song (sec)',
+    'Manual Actions per Song',
+    'Avg Errors per Session',
+    'Avg Duplicates per Session',
+)
+_LABELS = ('Before', 'After')
+_COLORS = ('#e74c3c', '#27ae60')
+_SUPTITLE = 'Lean Music Organizer: Before vs After Improvement'
+_FIG = None
+_PLOT_READY = False
+
+def _load_pyplot():
+    """Import pyplot on first use, selecting the backend and style once"""
+    global _PLOT_READY
+    # Tracked with a flag: pyplot may already have been imported by someone else
+    import matplotlib
+    if not _PLOT_READY and _HEADLESS:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    if not _PLOT_READY:
+        plt.style.use('seaborn-v0_8')
+        plt.rcParams['path.simplify_threshold'] = 1.0
+        _PLOT_READY = True
+    return plt
+
+def _show_chart_file():
+    """Display the saved chart without re-rendering it from the log"""
+    plt = _load_pyplot()
+    img = plt.imread(CHART_FILE)
+    fig = plt.figure(figsize=(14, 10), dpi=100)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.imshow(img)
+    ax.axis('off')
+    plt.show()
+
 def generate_visualizations():
     """Create Before vs After comparison charts"""
-    if not os.path.exists(LOG_FILE):
+    log_files = [p for p in (LOG_FILE, PENDING_LOG_FILE) if os.path.exists(p)]
+    if LOG_FILE in log_files and not _HAVE_PYARROW:
+        print(f"pyarrow is not installed; skipping {LOG_FILE}")
+        log_files.remove(LOG_FILE)
+    if not log_files:
         print("No log data found.")
         return
 
-    df = pd.read_csv(LOG_FILE)
-    before = df[df['session_type'] == 'before']
-    after = df[df['session_type'] == 'after']
-
-    if len(before) == 0 or len(after) == 0:
-        print("Need both 'before' and 'after' data.")
+    # Chart written after the last log update -> nothing new to draw
+    log_mtime = max(os.path.getmtime(p) for p in log_files)
+    if os.path.exists(CHART_FILE) and os.path.getmtime(CHART_FILE) >= log_mtime:
+        print(f"\nChart up-to-date: {CHART_FILE}")
+        if not _HEADLESS:
+            _show_chart_file()
         return
 
-    # Calculate averages
-    metrics = ['avg_time_per_song_sec', 'manual_actions_per_song', 'errors', 'duplicates']
-    before_avg = before[metrics].mean()
-    after_avg = after[metrics].mean()
+    import numpy as np
+    import pandas as pd
+    plt = _load_pyplot()
+
+    if PENDING_LOG_FILE not in log_files:
+        df = pd.read_parquet(LOG_FILE, columns=['session_type', *_METRICS])
+    elif _HAVE_PYARROW:
+        df = _fold_pending_log()
+    else:
+        df = _read_pending_log()
 
-    # Plot
-    plt.style.use('seaborn-v0_8')
-    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-    fig.suptitle('Lean Music Organizer: Before vs After Improvement', fontsize=16, fontweight='bold')
+    # Calculate averages with plain numpy reductions over one contiguous array
+    session = df['session_type'].to_numpy()
+    before_mask = session == 'before'
+    after_mask = session == 'after'
 
-    labels = ['Before', 'After']
-    colors = ['#e74c3c', '#27ae60']
+    if not before_mask.any() or not after_mask.any():
+        print("Need both 'before' and 'after' data.")
+        return
 
-    # Time per song
-    axes[0,0].bar(labels, [before_avg['avg_time_per_song_sec'], after_avg['avg_time_per_song_sec']], color=colors)
-    axes[0,0].set_title('Avg Time per Song (sec)')
+    arr = np.ascontiguousarray(df[list(_METRICS)].to_numpy(dtype=np.float32))
+    before_avg = arr[before_mask].mean(axis=0)
+    after_avg = arr[after_mask].mean(axis=0)
+
+    # Plot (reuse the figure between renders; recreate it if its window was closed)
+    global _FIG
+    if _FIG is None or not plt.fignum_exists(_FIG.number):
+        _FIG = plt.figure(figsize=(14, 10), dpi=100)
+    else:
+        _FIG.clf()
+    fig = _FIG
+    axes = fig.subplots(2, 2)
+    fig.suptitle(_SUPTITLE, fontsize=16, fontweight='bold')
+
+    # One (metric, before/after) row per subplot
+    data = np.column_stack((before_avg, after_avg))
+
+    for ax, row, title in zip(axes.flat, data, _TITLES):
+        bars = ax.bar(_LABELS, row, color=_COLORS)
+        ax.set_title(title)
+        ax.bar_label(bars, fmt='%.1f', padding=3, fontweight='bold')
     axes[0,0].set_ylabel('Seconds')
-    for i, v in enumerate([before_avg['avg_time_per_song_sec'], after_avg['avg_time_per_song_sec']]):
-        axes[0,0].text(i, v + 5, f"{v:.0f}", ha='center', fontweight='bold')
-
-    # Manual actions
-    axes[0,1].bar(labels, [before_avg['manual_actions_per_song'], after_avg['manual_actions_per_song']], color=colors)
-    axes[0,1].set_title('Manual Actions per Song')
-    for i, v in enumerate([before_avg['manual_actions_per_song'], after_avg['manual_actions_per_song']]):
-        axes[0,1].text(i, v + 0.1, f"{v:.1f}", ha='center', fontweight='bold')
-
-    # Errors
-    axes[1,0].bar(labels, [before_avg['errors'], after_avg['errors']], color=colors)
-    axes[1,0].set_title('Avg Errors per Session')
-    for i, v in enumerate([before_avg['errors'], after_avg['errors']]):
-        axes[1,0].text(i, v + 0.1, f"{v:.1f}", ha='center', fontweight='bold')
-
-    # Duplicates
-    axes[1,1].bar(labels, [before_avg['duplicates'], after_avg['duplicates']], color=colors)
-    axes[1,1].set_title('Avg Duplicates per Session')
-    for i, v in enumerate([before_avg['duplicates'], after_avg['duplicates']]):
-        axes[1,1].text(i, v + 0.1, f"{v:.1f}", ha='center', fontweight='bold')
-
-    plt.tight_layout()
-    plt.savefig(CHART_FILE, dpi=150, bbox_inches='tight')
-    plt.show()
+
+    # Tight padding here instead of bbox_inches='tight', which renders the figure twice
+    fig.tight_layout(pad=0.5, rect=(0, 0, 1, 0.96))
+    fig.savefig(CHART_FILE, dpi=150)
+    if not _HEADLESS:
+        plt.show()
 
     print(f"\nVisualizations saved to: {CHART_FILE}")
 
@@ -231,14 +348,20 @@ def generate_visualizations():
 # MAIN EXECUTION
 # ===========================
 def main():
-    print("="*70)
-    print("LEAN MUSIC ORGANIZER")
-    print("Apply Lean Process Improvement to Your Digital Music Library")
-    print("="*70)
+    sys.stdout.write(
+        "="*70 + "\n"
+        "LEAN MUSIC ORGANIZER\n"
+        "Apply Lean Process Improvement to Your Digital Music Library\n"
+        + "="*70 + "\n"
+    )
 
     # Count input files
-    music_files = [f for f in os.listdir(MUSIC_INPUT_DIR) if f.lower().endswith(('.mp3', '.flac', '.m4a', '.wav'))]
-    file_count = len(music_files)
+    with os.scandir(MUSIC_INPUT_DIR) as entries:
+        file_count = sum(
+            1 for e in entries
+            if os.path.splitext(e.name)[1].lower() in MUSIC_EXTENSIONS
+            and e.is_file()
+        )
 
     if file_count == 0:
         print(f"No music files found in '{MUSIC_INPUT_DIR}/'")
@@ -262,19 +385,23 @@ def main():
     generate_visualizations()
 
     # FINAL SUMMARY
-    time_saved_percent = round((1 - after_data['avg_time_per_song_sec'] / before_data['avg_time_per_song_sec']) * 100)
-    error_reduction_percent = round((1 - after_data['errors'] / max(1, before_data['errors'])) * 100)
-
-    print("\n" + "="*70)
-    print("LEAN IMPROVEMENT RESULTS")
-    print("="*70)
-    print(f"TIME SAVED PER SONG: {time_saved_percent}%")
-    print(f"ERROR REDUCTION: {error_reduction_percent}%")
-    print(f"VISUALIZATION: {CHART_FILE}")
-    print(f"LOG FILE: {LOG_FILE}")
-    print(f"ORGANIZED FILES: {MUSIC_OUTPUT_DIR}/")
-    print("="*70)
-    print("You've successfully applied Lean principles to your music library!")
+    before_time, after_time = before_data['avg_time_per_song_sec'], after_data['avg_time_per_song_sec']
+    before_errors, after_errors = before_data['errors'], after_data['errors']
+    time_saved_percent = round((1 - after_time / before_time) * 100)
+    error_reduction_percent = round((1 - after_errors / max(1, before_errors)) * 100)
+
+    sys.stdout.write(
+        "\n" + "="*70 + "\n"
+        "LEAN IMPROVEMENT RESULTS\n"
+        + "="*70 + "\n"
+        f"TIME SAVED PER SONG: {time_saved_percent}%\n"
+        f"ERROR REDUCTION: {error_reduction_percent}%\n"
+        f"VISUALIZATION: {CHART_FILE}\n"
+        f"LOG FILE: {LOG_FILE if _HAVE_PYARROW else PENDING_LOG_FILE}\n"
+        f"ORGANIZED FILES: {MUSIC_OUTPUT_DIR}/\n"
+        + "="*70 + "\n"
+        "You've successfully applied Lean principles to your music library!\n"
+    )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file